@@ -43,6 +43,6 @@ echo "  /stt-arm {}            - Start continuous listening"
 echo "  /stt-disarm {}         - Stop continuous listening"
 echo ""
 echo "Install dependencies:"
-echo "  pip install faster-whisper pyaudio"
+echo "  pip install faster-whisper sounddevice"
 echo ""
 echo "Restart Claude Code to use the commands."
@@ -5,11 +5,18 @@ Cloud-based Speech-to-Text using OpenAI Whisper API
 MUCH faster than local Whisper on systems without GPU.
 Typical response time: 1-2 seconds vs 10-30+ seconds locally.
 
-Cost: ~$0.006 per minute of audio
+Cost: ~$0.003 per minute of audio (gpt-4o-mini-transcribe),
+      ~$0.006 per minute (whisper-1)
+
+With the gpt-4o transcription models the transcript is streamed back and
+partial text is printed to stderr while the rest is still being decoded.
 
 Requirements:
-- pip install openai pyaudio
+- pip install openai sounddevice numpy
 - OPENAI_API_KEY environment variable set
+- Optional: pip install webrtcvad (more reliable end-of-speech detection)
+- Optional: pip install scipy (resampling for devices without 16 kHz input)
+- Optional: pip install h2 (HTTP/2 connections to the API)
 
 Usage:
   python3 stt_cloud.py
@@ -18,35 +25,38 @@ Environment Variables:
   STT_LANGUAGE - Language code (e.g., "de", "en"), default: auto-detect
   STT_MAX_SECONDS - Maximum recording time in seconds, default: 60
   STT_SILENCE_THRESHOLD - Silence duration to stop recording, default: 2.0
+  STT_CHUNK_MS - Audio buffer size in milliseconds (at least 10), default: 20
+  STT_CLIENT_VAD - End-of-speech detection while recording: "webrtc" or "rms",
+                   default: "webrtc" if webrtcvad is installed
+  STT_OPENAI_MODEL - Transcription model, default: "gpt-4o-mini-transcribe"
+                     ("gpt-4o-transcribe", "whisper-1" also supported)
+  STT_STREAM_UPLOAD - Set to "1" to upload audio while recording, default: "0"
   OPENAI_API_KEY - Your OpenAI API key
 """
 
 import io
 import json
 import os
+import queue
+import struct
 import sys
-import tempfile
+import threading
 import time
-import wave
-from pathlib import Path
+import uuid
+
+from stt_common import CHANNELS, RATE, AudioConfig, check_audio_deps, encode_wav, record_audio
 
-# Audio recording parameters
-CHUNK = 1024
-FORMAT_PYAUDIO = None  # Set after import
-CHANNELS = 1
-RATE = 16000  # Whisper optimal sample rate
+# Transcription model; the gpt-4o models support streamed transcription
+OPENAI_MODEL = os.getenv("STT_OPENAI_MODEL") or "gpt-4o-mini-transcribe"
+NON_STREAMING_MODELS = {"whisper-1"}
+
+# Upload audio while it is being recorded (see StreamingUpload)
+STREAM_UPLOAD = os.getenv("STT_STREAM_UPLOAD") == "1"
 
 
 def check_dependencies():
     """Check if required packages are installed."""
-    missing = []
-
-    try:
-        import pyaudio
-        global FORMAT_PYAUDIO
-        FORMAT_PYAUDIO = pyaudio.paInt16
-    except ImportError:
-        missing.append("pyaudio")
+    missing = check_audio_deps()
 
     try:
         import openai
@@ -64,98 +74,50 @@ def check_dependencies():
     return None
 
 
-def record_audio(max_seconds: float = 60.0, silence_threshold: float = 2.0) -> bytes:
-    """
-    Record audio from microphone until silence is detected or max_seconds reached.
+# Client and connection pool shared by warmup, uploads and transcription
+_client = None
+_http_client = None
+_client_lock = threading.Lock()
 
-    Uses simple RMS-based silence detection for fast response.
-    """
-    import pyaudio
-    import struct
-    import math
-
-    p = pyaudio.PyAudio()
 
-    # Find the default input device
-    try:
-        default_device = p.get_default_input_device_info()
-        device_index = default_device['index']
-    except IOError:
-        # Fallback to first available input device
-        device_index = None
-        for i in range(p.get_device_count()):
-            dev = p.get_device_info_by_index(i)
-            if dev['maxInputChannels'] > 0:
-                device_index = i
-                break
+def get_client():
+    """Get or create the cached OpenAI client."""
+    global _client, _http_client
+    import httpx
+    import openai
 
-        if device_index is None:
-            p.terminate()
-            raise RuntimeError("No audio input device found")
+    with _client_lock:
+        if _client is None:
+            # HTTP/2 needs the optional h2 package
+            try:
+                import h2
+                http2 = True
+            except ImportError:
+                http2 = False
 
-    stream = p.open(
-        format=FORMAT_PYAUDIO,
-        channels=CHANNELS,
-        rate=RATE,
-        input=True,
-        input_device_index=device_index,
-        frames_per_buffer=CHUNK
-    )
+            _http_client = openai.DefaultHttpxClient(http2=http2)
+            _client = openai.OpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                timeout=httpx.Timeout(30.0, connect=5.0),
+                http_client=_http_client
+            )
 
-    frames = []
-    start_time = time.time()
-    last_sound_time = time.time()
-    has_speech = False
+        return _client
 
-    # RMS threshold for silence detection (adjust as needed)
-    SILENCE_RMS_THRESHOLD = 500
 
-    print("Recording... (speak now)", file=sys.stderr)
+def warm_up():
+    """Open the HTTPS connection to the API while the user is still speaking."""
+    if not os.getenv("OPENAI_API_KEY"):
+        return
 
     try:
-        while True:
-            elapsed = time.time() - start_time
-
-            # Check max duration
-            if elapsed > max_seconds:
-                break
-
-            # Read audio chunk
-            data = stream.read(CHUNK, exception_on_overflow=False)
-            frames.append(data)
-
-            # Calculate RMS for silence detection
-            shorts = struct.unpack(f'{CHUNK}h', data)
-            rms = math.sqrt(sum(s ** 2 for s in shorts) / CHUNK)
-
-            if rms > SILENCE_RMS_THRESHOLD:
-                has_speech = True
-                last_sound_time = time.time()
-
-            # Stop if silence detected after speech
-            if has_speech and (time.time() - last_sound_time) > silence_threshold:
-                break
-
-    finally:
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
-
-    print("Recording finished.", file=sys.stderr)
-
-    # Convert to WAV format in memory
-    wav_buffer = io.BytesIO()
-    with wave.open(wav_buffer, 'wb') as wf:
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(2)  # 16-bit = 2 bytes
-        wf.setframerate(RATE)
-        wf.writeframes(b''.join(frames))
-
-    return wav_buffer.getvalue()
+        get_client().models.retrieve(OPENAI_MODEL)
+    except Exception:
+        pass  # Errors surface again during transcription
 
 
 def transcribe_with_openai(audio_data: bytes, language: str = None) -> dict:
-    """Send audio to OpenAI Whisper API for transcription."""
+    """Send audio to the OpenAI transcription API."""
     import openai
 
     api_key = os.getenv("OPENAI_API_KEY")
@@ -167,27 +129,37 @@ def transcribe_with_openai(audio_data: bytes, language: str = None) -> dict:
             "retryable": False
         }
 
-    client = openai.OpenAI(api_key=api_key)
+    client = get_client()
 
-    # Save to temp file (OpenAI API requires file-like object)
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-        tmp.write(audio_data)
-        tmp_path = tmp.name
+    # In-memory file; the name tells the API which audio format it is
+    audio_file = io.BytesIO(audio_data)
+    audio_file.name = "audio.wav"
 
     try:
-        with open(tmp_path, "rb") as audio_file:
-            kwargs = {
-                "model": "whisper-1",
-                "file": audio_file,
-                "response_format": "text"
-            }
+        kwargs = {
+            "model": OPENAI_MODEL,
+            "file": audio_file,
+        }
+
+        if language:
+            kwargs["language"] = language
 
-            if language:
-                kwargs["language"] = language
+        start = time.time()
 
-            start = time.time()
-            transcript = client.audio.transcriptions.create(**kwargs)
-            elapsed = time.time() - start
+        if OPENAI_MODEL in NON_STREAMING_MODELS:
+            transcript = client.audio.transcriptions.create(response_format="text", **kwargs)
+        else:
+            # Show partial text as soon as the first tokens arrive
+            transcript = ""
+            for event in client.audio.transcriptions.create(stream=True, **kwargs):
+                if event.type == "transcript.text.delta":
+                    transcript += event.delta
+                    print(event.delta, end="", file=sys.stderr, flush=True)
+                elif event.type == "transcript.text.done":
+                    transcript = event.text
+            print(file=sys.stderr)
+
+        elapsed = time.time() - start
 
         return {
             "success": True,
@@ -227,12 +199,165 @@ def transcribe_with_openai(audio_data: bytes, language: str = None) -> dict:
             "retryable": False
         }
 
-    finally:
-        # Clean up temp file
+
+class StreamingUpload:
+    """
+    Upload audio to the OpenAI API while it is still being recorded.
+
+    Recorded chunks are queued by feed() and sent by a background thread
+    as a chunked multipart request, so the upload is essentially done
+    when the recording ends.
+    """
+
+    def __init__(self, language: str = None):
+        self.chunks = queue.Queue()
+        self.cancelled = False
+        self.result = None
+        self.finish_time = None
+        self.thread = threading.Thread(target=self._run, args=(language,), daemon=True)
+        self.thread.start()
+
+    def feed(self, data: bytes, rate: int = RATE):
+        """Queue a chunk of 16-bit PCM audio recorded at rate for upload."""
+        self.chunks.put((data, rate))
+
+    def finish(self) -> dict:
+        """Finish the upload and wait for the transcription result."""
+        self.finish_time = time.time()
+        self.chunks.put(None)
+        self.thread.join()
+        return self.result
+
+    def cancel(self):
+        """Abort the upload, e.g. because no speech was recorded."""
+        self.cancelled = True
+        self.chunks.put(None)
+
+    def _body(self, boundary: str, fields: dict):
+        """Generate the multipart body, streaming the WAV file part."""
+        for name, value in fields.items():
+            yield (
+                f"--{boundary}\r\n"
+                f"Content-Disposition: form-data; name=\"{name}\"\r\n\r\n"
+                f"{value}\r\n"
+            ).encode()
+
+        yield (
+            f"--{boundary}\r\n"
+            f"Content-Disposition: form-data; name=\"file\"; filename=\"audio.wav\"\r\n"
+            f"Content-Type: audio/wav\r\n\r\n"
+        ).encode()
+
+        header_sent = False
+
+        while True:
+            item = self.chunks.get()
+            if item is None:
+                break
+
+            data, rate = item
+
+            # The final length is unknown, so the WAV sizes are set to the maximum
+            if not header_sent:
+                yield struct.pack(
+                    "<4sI4s4sIHHIIHH4sI",
+                    b"RIFF", 0xFFFFFFFF, b"WAVE",
+                    b"fmt ", 16, 1, CHANNELS, rate, rate * CHANNELS * 2, CHANNELS * 2, 16,
+                    b"data", 0xFFFFFFFF
+                )
+                header_sent = True
+
+            yield data
+
+        if self.cancelled:
+            raise RuntimeError("Upload cancelled")
+
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    def _run(self, language: str):
+        import httpx
+
+        fields = {"model": OPENAI_MODEL}
+        if language:
+            fields["language"] = language
+        if OPENAI_MODEL in NON_STREAMING_MODELS:
+            fields["response_format"] = "text"
+        else:
+            fields["stream"] = "true"
+
+        boundary = uuid.uuid4().hex
+        client = get_client()
+
         try:
-            Path(tmp_path).unlink()
-        except:
-            pass
+            with _http_client.stream(
+                "POST",
+                str(client.base_url.join("audio/transcriptions")),
+                headers={
+                    "Authorization": f"Bearer {client.api_key}",
+                    "Content-Type": f"multipart/form-data; boundary={boundary}",
+                },
+                content=self._body(boundary, fields),
+                timeout=httpx.Timeout(60.0, connect=5.0)
+            ) as response:
+                if response.status_code in (401, 403):
+                    self.result = {
+                        "success": False,
+                        "error": "auth",
+                        "message": "OpenAI API authentication failed. Check your OPENAI_API_KEY.",
+                        "retryable": False
+                    }
+                    return
+
+                if response.status_code == 429:
+                    self.result = {
+                        "success": False,
+                        "error": "limit",
+                        "message": "OpenAI API rate limit reached. Wait before retrying.",
+                        "retryable": False
+                    }
+                    return
+
+                if response.status_code != 200:
+                    self.result = {
+                        "success": False,
+                        "error": "api_error",
+                        "message": f"OpenAI API error: {response.status_code} {response.read().decode(errors='replace')}",
+                        "retryable": False
+                    }
+                    return
+
+                if OPENAI_MODEL in NON_STREAMING_MODELS:
+                    transcript = response.read().decode()
+                else:
+                    transcript = ""
+                    for line in response.iter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        try:
+                            event = json.loads(line[len("data:"):])
+                        except ValueError:
+                            continue  # e.g. a "[DONE]" sentinel
+                        if event.get("type") == "transcript.text.delta":
+                            transcript += event["delta"]
+                            print(event["delta"], end="", file=sys.stderr, flush=True)
+                        elif event.get("type") == "transcript.text.done":
+                            transcript = event["text"]
+                            break
+                    print(file=sys.stderr)
+
+                self.result = {
+                    "success": True,
+                    "transcript": transcript.strip(),
+                    "processing_time": round(time.time() - self.finish_time, 2)
+                }
+
+        except Exception as e:
+            self.result = {
+                "success": False,
+                "error": "error",
+                "message": f"Transcription failed: {str(e)}",
+                "retryable": False
+            }
 
 
 def main():
@@ -246,22 +371,33 @@ def main():
 
     # Get configuration from environment
     language = os.getenv("STT_LANGUAGE") or None
-    max_seconds = float(os.getenv("STT_MAX_SECONDS") or "60")
-    silence_threshold = float(os.getenv("STT_SILENCE_THRESHOLD") or "2.0")
+    config = AudioConfig.from_env()
+
+    upload = None
 
     try:
+        if STREAM_UPLOAD and os.getenv("OPENAI_API_KEY"):
+            upload = StreamingUpload(language)
+
         # Record audio
-        audio_data = record_audio(max_seconds=max_seconds, silence_threshold=silence_threshold)
+        samples = record_audio(
+            config,
+            warmup_callback=None if upload else warm_up,
+            chunk_callback=upload.feed if upload else None
+        )
 
-        if len(audio_data) < 1000:  # Too short
+        if len(samples) < 500:  # Too short
             result = {
                 "success": False,
                 "error": "no_speech",
                 "message": "No speech detected. Please speak louder or check microphone."
             }
+        elif upload:
+            result = upload.finish()
+            upload = None
         else:
             # Transcribe with OpenAI
-            result = transcribe_with_openai(audio_data, language)
+            result = transcribe_with_openai(encode_wav(samples), language)
 
     except RuntimeError as e:
         result = {
@@ -277,6 +413,9 @@ def main():
             "message": f"Unexpected error: {str(e)}"
         }
 
+    if upload:
+        upload.cancel()
+
     print(json.dumps(result))
 
 
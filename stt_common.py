@@ -0,0 +1,271 @@
+"""
+Shared microphone recording for the STT provider scripts
+
+Used by stt_cloud.py, stt_fast_local.py and stt_gemini.py. Records from
+the default input device until the user stops speaking:
+
+- Audio arrives in 20 ms blocks from PortAudio's callback thread
+- End of speech is detected with webrtcvad, or an RMS threshold without it
+- Devices without 16 kHz input are recorded at their native rate and
+  resampled afterwards (needs scipy)
+- Audio goes into a buffer preallocated for max_seconds
+
+Requirements:
+- pip install sounddevice numpy
+- Optional: pip install webrtcvad (more reliable end-of-speech detection)
+- Optional: pip install scipy (resampling for devices without 16 kHz input)
+
+Environment Variables:
+  STT_MAX_SECONDS - Maximum recording time in seconds, default: 60
+  STT_SILENCE_THRESHOLD - Silence duration to stop recording, default: 2.0
+  STT_CHUNK_MS - Audio buffer size in milliseconds (at least 10), default: 20
+  STT_CLIENT_VAD - End-of-speech detection while recording: "webrtc" or "rms",
+                   default: "webrtc" if webrtcvad is installed
+"""
+
+import io
+import math
+import os
+import queue
+import sys
+import threading
+import warnings
+import wave
+from dataclasses import dataclass
+
+# C implementation of the RMS fallback (deprecated, removed in Python 3.13)
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import audioop
+except ImportError:
+    audioop = None
+
+# Audio recording parameters
+CHANNELS = 1
+RATE = 16000  # Whisper optimal sample rate
+
+# Voice activity detection (webrtcvad only accepts 10, 20 or 30 ms frames)
+VAD_FRAME_MS = 20
+VAD_RATES = (8000, 16000, 32000, 48000)  # Sample rates webrtcvad supports
+VAD_AGGRESSIVENESS = 2  # 0 (least) to 3 (most aggressive)
+
+# RMS threshold for silence detection when webrtcvad is not used
+SILENCE_RMS_THRESHOLD = 500
+
+# Smallest accepted STT_CHUNK_MS (also webrtcvad's smallest frame)
+MIN_CHUNK_MS = 10
+
+# Seconds without audio from the input device before recording fails
+CAPTURE_TIMEOUT = 2.0
+
+
+def client_vad_mode() -> str:
+    """Speech detection used while recording: "webrtc" or "rms"."""
+    mode = os.getenv("STT_CLIENT_VAD")
+    if mode in ("webrtc", "rms"):
+        return mode
+
+    try:
+        import webrtcvad
+        return "webrtc"
+    except ImportError:
+        return "rms"
+
+
+@dataclass
+class AudioConfig:
+    """Recording settings."""
+
+    max_seconds: float = 60.0
+    silence_threshold: float = 2.0
+    chunk_ms: int = 20  # Latency of each stream read
+    client_vad: str = "rms"
+
+    def __post_init__(self):
+        # A zero-length block would never fill the buffer or count silence
+        self.chunk_ms = max(MIN_CHUNK_MS, self.chunk_ms)
+
+    @classmethod
+    def from_env(cls) -> "AudioConfig":
+        """Read the settings from the STT_* environment variables."""
+        return cls(
+            max_seconds=float(os.getenv("STT_MAX_SECONDS") or "60"),
+            silence_threshold=float(os.getenv("STT_SILENCE_THRESHOLD") or "2.0"),
+            chunk_ms=int(os.getenv("STT_CHUNK_MS") or "20"),
+            client_vad=client_vad_mode()
+        )
+
+
+def check_audio_deps() -> list:
+    """Return the pip names of missing packages needed for recording."""
+    missing = []
+
+    try:
+        import sounddevice
+    except (ImportError, OSError):  # OSError: PortAudio library not found
+        missing.append("sounddevice")
+
+    try:
+        import numpy
+    except ImportError:
+        missing.append("numpy")
+
+    if client_vad_mode() == "webrtc":
+        try:
+            import webrtcvad
+        except ImportError:
+            missing.append("webrtcvad")
+
+    return missing
+
+
+def record_audio(config: AudioConfig, warmup_callback=None, chunk_callback=None):
+    """
+    Record audio from microphone until silence is detected or max_seconds reached.
+
+    warmup_callback is run in a background thread as soon as speech is
+    detected, to prepare transcription while the user is still speaking.
+    chunk_callback receives every raw PCM chunk and its sample rate as
+    soon as it is read.
+
+    If webrtcvad can't handle the capture rate, the RMS threshold is used
+    instead and config.client_vad is set to "rms".
+
+    Returns the recording as a numpy array of 16 kHz 16-bit samples.
+    """
+    import numpy as np
+    import sounddevice as sd
+
+    vad = None  # RMS threshold
+    if config.client_vad == "webrtc":
+        import webrtcvad
+        vad = webrtcvad.Vad(VAD_AGGRESSIVENESS)
+
+    # Find the default input device
+    try:
+        device = sd.query_devices(kind='input')
+    except sd.PortAudioError:
+        # Fallback to first available input device
+        device = next((dev for dev in sd.query_devices() if dev['max_input_channels'] > 0), None)
+        if device is None:
+            raise RuntimeError("No audio input device found")
+
+    # Record at the device's native rate if it can't deliver 16 kHz itself
+    # and resample afterwards, instead of PortAudio's internal conversion
+    capture_rate = RATE
+    try:
+        sd.check_input_settings(
+            device=device['index'],
+            channels=CHANNELS,
+            dtype='int16',
+            samplerate=RATE
+        )
+    except sd.PortAudioError:
+        try:
+            from scipy.signal import resample_poly
+            capture_rate = int(device['default_samplerate'])
+        except ImportError:
+            pass  # Without scipy, let PortAudio convert
+
+    capture_chunk = capture_rate * config.chunk_ms // 1000
+    vad_frame_bytes = capture_rate * VAD_FRAME_MS // 1000 * 2  # 16-bit = 2 bytes
+    if capture_rate not in VAD_RATES:
+        # Fall back to the RMS threshold and record that in the config, so
+        # transcription keeps Whisper's VAD pass for this recording
+        vad = None
+        config.client_vad = "rms"
+
+    # PortAudio delivers each block from its audio thread; the callback only
+    # queues it, speech detection and buffering happen below
+    chunks = queue.Queue()
+
+    def callback(indata, frames, time_info, status):
+        chunks.put(indata.tobytes())
+
+    # Preallocate the whole recording instead of collecting chunks
+    buffer = bytearray(int(capture_rate * config.max_seconds) * 2)  # 16-bit = 2 bytes
+    pos = 0
+    silence_seconds = 0.0
+    has_speech = False
+    vad_pending = b''
+
+    print("Recording... (speak now)", file=sys.stderr)
+
+    with sd.InputStream(
+        samplerate=capture_rate,
+        device=device['index'],
+        channels=CHANNELS,
+        dtype='int16',
+        blocksize=capture_chunk,
+        latency='low',
+        callback=callback
+    ):
+        # Stop at max duration, when the buffer is full
+        while pos + capture_chunk * 2 <= len(buffer):
+            # Next audio chunk from the audio thread
+            try:
+                data = chunks.get(timeout=CAPTURE_TIMEOUT)
+            except queue.Empty:
+                raise RuntimeError("Audio input stopped delivering data")
+            buffer[pos:pos + len(data)] = data
+            pos += len(data)
+
+            if chunk_callback is not None:
+                chunk_callback(data, capture_rate)
+
+            if vad is not None:
+                # Re-slice the chunk into fixed-size VAD frames
+                vad_pending += data
+                while len(vad_pending) >= vad_frame_bytes:
+                    frame = vad_pending[:vad_frame_bytes]
+                    vad_pending = vad_pending[vad_frame_bytes:]
+                    if vad.is_speech(frame, capture_rate):
+                        has_speech = True
+                        silence_seconds = 0.0
+                    else:
+                        silence_seconds += VAD_FRAME_MS / 1000
+            else:
+                # Calculate RMS for silence detection
+                if audioop is not None:
+                    rms = audioop.rms(data, 2)
+                else:
+                    samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+                    rms = float(np.sqrt(np.dot(samples, samples) / len(samples)))
+
+                if rms > SILENCE_RMS_THRESHOLD:
+                    has_speech = True
+                    silence_seconds = 0.0
+                else:
+                    silence_seconds += config.chunk_ms / 1000
+
+            # Warm up the backend once, while the user is still speaking
+            if has_speech and warmup_callback is not None:
+                threading.Thread(target=warmup_callback, daemon=True).start()
+                warmup_callback = None
+
+            # Stop if silence detected after speech
+            if has_speech and silence_seconds > config.silence_threshold:
+                break
+
+    print("Recording finished.", file=sys.stderr)
+
+    pcm = np.frombuffer(buffer, dtype=np.int16, count=pos // 2)
+    if capture_rate != RATE:
+        gcd = math.gcd(RATE, capture_rate)
+        pcm = resample_poly(pcm, RATE // gcd, capture_rate // gcd)
+        pcm = np.clip(np.round(pcm), -32768, 32767).astype(np.int16)
+
+    return pcm
+
+
+def encode_wav(pcm) -> bytes:
+    """Encode 16 kHz mono int16 samples as WAV in memory."""
+    wav_buffer = io.BytesIO()
+    with wave.open(wav_buffer, 'wb') as wf:
+        wf.setnchannels(CHANNELS)
+        wf.setsampwidth(2)  # 16-bit = 2 bytes
+        wf.setframerate(RATE)
+        wf.writeframes(pcm)
+
+    return wav_buffer.getvalue()
@@ -1,17 +1,34 @@
+import atexit
 import json
 import os
 import sys
 import time
-from typing import List
+from typing import List, Optional, TextIO
 
 
 LOG_FILE = "stt_daemon.log"
+TRIGGER_FILE = "stt_triggers.jsonl"
+
+# Backoff between recorder errors, in seconds
+RETRY_MIN_DELAY = 0.1
+RETRY_MAX_DELAY = 5.0
+
+# Opened once and line-buffered, so each line is flushed without reopening
+_log_fp: Optional[TextIO] = None
+
+
+def open_append(path: str) -> TextIO:
+  fp = open(path, "a", buffering=1, encoding="utf-8")
+  atexit.register(fp.close)
+  return fp
 
 
 def log(msg: str) -> None:
+  global _log_fp
+  if _log_fp is None:
+    _log_fp = open_append(LOG_FILE)
   ts = time.strftime("%Y-%m-%d %H:%M:%S")
-  with open(LOG_FILE, "a", encoding="utf-8") as f:
-    f.write(f"[{ts}] {msg}\n")
+  _log_fp.write(f"[{ts}] {msg}\n")
 
 
 def main() -> None:
@@ -34,18 +51,36 @@ def main() -> None:
 
   buffer: List[str] = []
   listening = False
+  trig_fp = open_append(TRIGGER_FILE)
+
+  def emit(event: dict) -> None:
+    trig_fp.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+  # Only the start of an utterance can match a trigger, so only that is lowercased
+  head_len = max(len(trigger_prefix), len(stop_word))
+  triggers = (trigger_prefix, stop_word)
 
   def on_text(text: str) -> None:
-    nonlocal buffer
+    nonlocal buffer, listening
     text = text.strip()
     if not text:
       return
     log(f"Recognized: {text}")
-    lower = text.lower()
-    nonlocal listening
+    head = text[:head_len].lower()
+
+    # While listening, record all recognized text segments (most frequent case)
+    if listening and not head.startswith(triggers):
+      buffer.append(text)
+      event = {
+        "type": "text",
+        "raw_text": text,
+      }
+      emit(event)
+      log(f"Listening text: '{text}'")
+      return
 
     # Start listening: "claude schreibe ..."
-    if lower.startswith(trigger_prefix):
+    if head.startswith(trigger_prefix):
       listening = True
       content = text[len(trigger_prefix) :].strip()
       event = {
@@ -54,46 +89,35 @@ def main() -> None:
         "raw_text": text,
         "command_text": content,
       }
-      with open("stt_triggers.jsonl", "a", encoding="utf-8") as f:
-        f.write(json.dumps(event, ensure_ascii=False) + "\n")
+      emit(event)
       log(f"Start trigger detected, listening=True, command_text='{content}'")
       return
 
     # Stop listening: "claude stop"
-    if lower.startswith(stop_word):
-      if listening:
-        listening = False
-        event = {
-          "type": "stop",
-          "stop_word": stop_word,
-          "raw_text": text,
-        }
-        with open("stt_triggers.jsonl", "a", encoding="utf-8") as f:
-          f.write(json.dumps(event, ensure_ascii=False) + "\n")
-        log("Stop trigger detected, listening=False")
-      return
-
-    # While listening, record all recognized text segments
-    if listening:
-      buffer.append(text)
+    if head.startswith(stop_word) and listening:
+      listening = False
       event = {
-        "type": "text",
+        "type": "stop",
+        "stop_word": stop_word,
         "raw_text": text,
       }
-      with open("stt_triggers.jsonl", "a", encoding="utf-8") as f:
-        f.write(json.dumps(event, ensure_ascii=False) + "\n")
-      log(f"Listening text: '{text}'")
+      emit(event)
+      log("Stop trigger detected, listening=False")
 
-  # Simple loop: keep calling recorder.text with callback
+  # Simple loop: keep calling recorder.text with callback.
+  # Retry failures with exponential backoff, reset after each success.
+  delay = RETRY_MIN_DELAY
   while True:
     try:
       recorder.text(on_text)
+      delay = RETRY_MIN_DELAY
     except KeyboardInterrupt:
       log("STT daemon received KeyboardInterrupt, exiting.")
       break
     except Exception as exc:  # noqa: BLE001
-      log(f"Error in recorder loop: {exc}")
-      time.sleep(1.0)
+      log(f"Error in recorder loop: {exc} (retrying in {delay:.1f}s)")
+      time.sleep(delay)
+      delay = min(delay * 2, RETRY_MAX_DELAY)
 
 
 if __name__ == "__main__":
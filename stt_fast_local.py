@@ -15,7 +15,9 @@ Model comparison (on CPU, 10 sec audio):
 RECOMMENDED: Use "distil-de" for German speech - fastest AND best quality!
 
 Requirements:
-- pip install faster-whisper
+- pip install faster-whisper sounddevice
+- Optional: pip install webrtcvad (more reliable end-of-speech detection)
+- Optional: pip install scipy (resampling for devices without 16 kHz input)
 
 Usage:
   python3 stt_fast_local.py
@@ -24,36 +26,54 @@ Environment Variables:
   STT_LANGUAGE - Language code (e.g., "de", "en"), default: auto-detect
   STT_MAX_SECONDS - Maximum recording time in seconds, default: 60
   STT_SILENCE_THRESHOLD - Silence duration to stop recording, default: 2.0
+  STT_CHUNK_MS - Audio buffer size in milliseconds (at least 10), default: 20
+  STT_CLIENT_VAD - End-of-speech detection while recording: "webrtc" or "rms",
+                   default: "webrtc" if webrtcvad is installed
   STT_MODEL - Whisper model: "tiny", "base", "small", "distil-de", "distil-en"
              default: "distil-de" (optimized for German)
+  STT_CPU_THREADS - CPU threads used for inference, default: all cores
+  STT_BATCH_SIZE - Segments decoded per batch (faster-whisper >= 1.1.0),
+                   default: 8
+  STT_SERVER - Set to "0" to always load the model in-process instead of
+               using the resident stt_fast_server.py, default: "1"
+  STT_SOCKET - Socket path of stt_fast_server.py,
+               default: $XDG_RUNTIME_DIR/stt.sock
 """
 
-import io
+import base64
+import getpass
 import json
 import os
+import re
+import socket
+import subprocess
 import sys
 import tempfile
+import threading
 import time
-import wave
 from pathlib import Path
 
-# Audio recording parameters
-CHUNK = 1024
-FORMAT_PYAUDIO = None
-CHANNELS = 1
-RATE = 16000
+from stt_common import RATE, AudioConfig, check_audio_deps, record_audio
+
+# CTranslate2 threads; must be set before faster_whisper is imported
+CPU_THREADS = int(os.getenv("STT_CPU_THREADS") or os.cpu_count() or 4)
+os.environ.setdefault("OMP_NUM_THREADS", str(CPU_THREADS))
+
+# Resident model server (see stt_fast_server.py)
+USE_SERVER = (os.getenv("STT_SERVER", "1") != "0" and hasattr(socket, "AF_UNIX")
+              and hasattr(os, "getuid"))
+SOCKET_PATH = os.getenv("STT_SOCKET") or (
+    os.path.join(os.environ["XDG_RUNTIME_DIR"], "stt.sock") if os.getenv("XDG_RUNTIME_DIR")
+    else os.path.join(tempfile.gettempdir(), f"stt-{getpass.getuser()}.sock")
+)
+SERVER_TIMEOUT = 120.0  # Includes model download/load on first use
+SERVER_START_TIMEOUT = 10.0
+_server_spawned = False  # Set once this process started a server
 
 
 def check_dependencies():
     """Check if required packages are installed."""
-    missing = []
-
-    try:
-        import pyaudio
-        global FORMAT_PYAUDIO
-        FORMAT_PYAUDIO = pyaudio.paInt16
-    except ImportError:
-        missing.append("pyaudio")
+    missing = check_audio_deps()
 
     try:
         from faster_whisper import WhisperModel
@@ -72,84 +92,13 @@ def check_dependencies():
     return None
 
 
-def record_audio(max_seconds: float = 60.0, silence_threshold: float = 2.0) -> bytes:
-    """Record audio from microphone until silence is detected."""
-    import pyaudio
-    import struct
-    import math
-
-    p = pyaudio.PyAudio()
-
-    try:
-        default_device = p.get_default_input_device_info()
-        device_index = default_device['index']
-    except IOError:
-        device_index = None
-        for i in range(p.get_device_count()):
-            dev = p.get_device_info_by_index(i)
-            if dev['maxInputChannels'] > 0:
-                device_index = i
-                break
-
-        if device_index is None:
-            p.terminate()
-            raise RuntimeError("No audio input device found")
-
-    stream = p.open(
-        format=FORMAT_PYAUDIO,
-        channels=CHANNELS,
-        rate=RATE,
-        input=True,
-        input_device_index=device_index,
-        frames_per_buffer=CHUNK
-    )
-
-    frames = []
-    start_time = time.time()
-    last_sound_time = time.time()
-    has_speech = False
-    SILENCE_RMS_THRESHOLD = 500
-
-    print("Recording... (speak now)", file=sys.stderr)
-
-    try:
-        while True:
-            elapsed = time.time() - start_time
-            if elapsed > max_seconds:
-                break
-
-            data = stream.read(CHUNK, exception_on_overflow=False)
-            frames.append(data)
-
-            shorts = struct.unpack(f'{CHUNK}h', data)
-            rms = math.sqrt(sum(s ** 2 for s in shorts) / CHUNK)
-
-            if rms > SILENCE_RMS_THRESHOLD:
-                has_speech = True
-                last_sound_time = time.time()
-
-            if has_speech and (time.time() - last_sound_time) > silence_threshold:
-                break
-
-    finally:
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
-
-    print("Recording finished.", file=sys.stderr)
-
-    wav_buffer = io.BytesIO()
-    with wave.open(wav_buffer, 'wb') as wf:
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(2)
-        wf.setframerate(RATE)
-        wf.writeframes(b''.join(frames))
-
-    return wav_buffer.getvalue()
-
-
 # Global model cache to avoid reloading
 _model_cache = {}
+_model_lock = threading.Lock()  # Warmup thread may load concurrently
+_warmed = set()  # Cache keys of models that already ran warm_model
+
+# Segments decoded per batch by BatchedInferencePipeline
+BATCH_SIZE = int(os.getenv("STT_BATCH_SIZE") or "8")
 
 # Model name mapping - maps short names to HuggingFace model IDs
 MODEL_MAPPING = {
@@ -168,6 +117,14 @@ MODEL_LANGUAGE = {
 }
 
 
+def supports_batched_inference() -> bool:
+    """Check if faster-whisper provides BatchedInferencePipeline (>= 1.1.0)."""
+    import faster_whisper
+
+    version = tuple(int(part) for part in re.findall(r"\d+", faster_whisper.__version__)[:3])
+    return version >= (1, 1, 0)
+
+
 def get_model(model_size: str):
     """Get or create cached Whisper model."""
     global _model_cache
@@ -176,32 +133,80 @@ def get_model(model_size: str):
     actual_model = MODEL_MAPPING.get(model_size, model_size)
     cache_key = actual_model
 
-    if cache_key not in _model_cache:
-        from faster_whisper import WhisperModel
+    with _model_lock:
+        if cache_key not in _model_cache:
+            from faster_whisper import WhisperModel
 
-        print(f"Loading whisper model: {model_size} ({actual_model})...", file=sys.stderr)
-        start = time.time()
+            print(f"Loading whisper model: {model_size} ({actual_model})...", file=sys.stderr)
+            start = time.time()
 
-        # Use INT8 quantization for faster CPU inference
-        _model_cache[cache_key] = WhisperModel(
-            actual_model,
-            device="cpu",
-            compute_type="int8"
-        )
+            # Use INT8 quantization for faster CPU inference
+            model = WhisperModel(
+                actual_model,
+                device="cpu",
+                compute_type="int8",
+                cpu_threads=CPU_THREADS,
+                num_workers=1
+            )
 
-        elapsed = time.time() - start
-        print(f"Model loaded in {elapsed:.1f}s", file=sys.stderr)
+            # Decode VAD segments of longer recordings in parallel batches
+            if supports_batched_inference():
+                from faster_whisper import BatchedInferencePipeline
+                model = BatchedInferencePipeline(model=model)
+
+            _model_cache[cache_key] = model
+
+            elapsed = time.time() - start
+            print(f"Model loaded in {elapsed:.1f}s", file=sys.stderr)
+
+        return _model_cache[cache_key]
+
+
+def warm_model(model_size: str):
+    """
+    Load the model and run one second of silence through it.
+
+    CTranslate2 allocates its buffers on the first inference. Only call
+    this where it overlaps other work (server preload, recording), since
+    Whisper pads the silence to a full 30 s window.
+    """
+    model = get_model(model_size)
+    cache_key = MODEL_MAPPING.get(model_size, model_size)
 
-    return _model_cache[cache_key]
+    if cache_key in _warmed:
+        return
+
+    import numpy as np
+    silent = np.zeros(RATE, dtype=np.float32)
+
+    # Plain WhisperModel: the batched pipeline needs clip_timestamps without VAD
+    whisper = model
+    if supports_batched_inference():
+        from faster_whisper import BatchedInferencePipeline
+        if isinstance(model, BatchedInferencePipeline):
+            whisper = model.model
+
+    segments, _ = whisper.transcribe(
+        silent,
+        beam_size=1,
+        vad_filter=False,
+        language=MODEL_LANGUAGE.get(model_size)
+    )
+    list(segments)
 
+    # Only after success, so a failed warm-up is retried next time
+    _warmed.add(cache_key)
 
-def transcribe_local(audio_data: bytes, language: str = None, model_size: str = "tiny") -> dict:
-    """Transcribe audio using faster-whisper."""
 
-    # Save to temp file
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-        tmp.write(audio_data)
-        tmp_path = tmp.name
+def transcribe_local(samples, language: str = None, model_size: str = "tiny",
+                     client_vad: str = "rms", silence_threshold: float = 2.0) -> dict:
+    """
+    Transcribe 16 kHz mono int16 samples using faster-whisper.
+
+    client_vad is the speech detection used while recording. After webrtcvad
+    Whisper's own VAD pass is skipped; after the RMS threshold it is kept to
+    filter out the noise that may have been recorded.
+    """
 
     try:
         model = get_model(model_size)
@@ -212,16 +217,35 @@ def transcribe_local(audio_data: bytes, language: str = None, model_size: str =
         kwargs = {
             "beam_size": 1,  # Faster, slightly less accurate
             "best_of": 1,
-            "vad_filter": True,  # Filter out non-speech
         }
 
+        if client_vad == "webrtc":
+            kwargs["vad_filter"] = False
+        else:
+            kwargs["vad_filter"] = True  # Filter out non-speech
+            kwargs["vad_parameters"] = {"min_silence_duration_ms": int(silence_threshold * 1000)}
+
         # Use language hint from model if not explicitly provided
         if language:
             kwargs["language"] = language
         elif model_size in MODEL_LANGUAGE:
             kwargs["language"] = MODEL_LANGUAGE[model_size]
 
-        segments, info = model.transcribe(tmp_path, **kwargs)
+        if supports_batched_inference():
+            kwargs["batch_size"] = BATCH_SIZE
+
+            # Without VAD, the batched pipeline needs explicit 30 s windows
+            if not kwargs["vad_filter"]:
+                window = 30 * RATE
+                kwargs["clip_timestamps"] = [
+                    {"start": start_sample, "end": min(start_sample + window, len(samples))}
+                    for start_sample in range(0, len(samples), window)
+                ]
+
+        # Whisper expects float32 samples in [-1, 1]
+        audio = samples.astype("float32") / 32768.0
+
+        segments, info = model.transcribe(audio, **kwargs)
 
         # Collect all segments
         transcript_parts = []
@@ -255,11 +279,110 @@ def transcribe_local(audio_data: bytes, language: str = None, model_size: str =
             "message": f"Transcription failed: {str(e)}"
         }
 
-    finally:
-        try:
-            Path(tmp_path).unlink()
-        except:
+
+def connect_server(timeout: float = None) -> socket.socket:
+    """
+    Connect to stt_fast_server.py.
+
+    SOCKET_PATH may be in a shared directory like /tmp, so sockets owned by
+    another user are refused: they would receive the recorded audio and
+    could answer with arbitrary transcripts.
+    """
+    if os.stat(SOCKET_PATH).st_uid != os.getuid():
+        raise PermissionError(f"{SOCKET_PATH} is owned by another user")
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(SOCKET_PATH)
+    except OSError:
+        sock.close()
+        raise
+
+    return sock
+
+
+def transcribe_via_server(samples, language: str = None, model_size: str = "tiny",
+                          client_vad: str = "rms", silence_threshold: float = 2.0):
+    """
+    Transcribe audio using a running stt_fast_server.py.
+
+    Returns None if no server is reachable, so the caller can fall back
+    to in-process transcription.
+    """
+    request = json.dumps({
+        "pcm_b64": base64.b64encode(samples.tobytes()).decode(),
+        "language": language,
+        "model": model_size,
+        "client_vad": client_vad,
+        "silence_threshold": silence_threshold,
+    }).encode()
+
+    try:
+        with connect_server(SERVER_TIMEOUT) as sock:
+            sock.sendall(request)
+            sock.shutdown(socket.SHUT_WR)
+            response = b''.join(iter(lambda: sock.recv(65536), b''))
+
+        return json.loads(response)
+
+    except (OSError, ValueError):
+        return None
+
+
+def server_running() -> bool:
+    """Check whether a server listens on SOCKET_PATH (not just a stale file)."""
+    try:
+        with connect_server():
             pass
+        return True
+    except OSError:
+        return False
+
+
+def spawn_server():
+    """Start stt_fast_server.py in the background."""
+    global _server_spawned
+    _server_spawned = True
+
+    server_script = Path(__file__).with_name("stt_fast_server.py")
+
+    print("Starting whisper model server...", file=sys.stderr)
+
+    # Detach completely: the caller waits for our stdout/stderr to close
+    subprocess.Popen(
+        [sys.executable, str(server_script)],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+
+def start_server() -> bool:
+    """Start stt_fast_server.py in the background and wait until it accepts connections."""
+    if not _server_spawned:
+        spawn_server()
+
+    deadline = time.time() + SERVER_START_TIMEOUT
+    while time.time() < deadline:
+        if server_running():
+            return True
+        time.sleep(0.05)
+
+    return False
+
+
+def warm_up(model_size: str):
+    """Start loading the model while the user is still speaking."""
+    try:
+        if USE_SERVER:
+            if not server_running():
+                spawn_server()
+        else:
+            warm_model(model_size)
+    except Exception:
+        pass  # Errors surface again during transcription
 
 
 def main():
@@ -271,8 +394,7 @@ def main():
         return
 
     language = os.getenv("STT_LANGUAGE") or None
-    max_seconds = float(os.getenv("STT_MAX_SECONDS") or "60")
-    silence_threshold = float(os.getenv("STT_SILENCE_THRESHOLD") or "2.0")
+    config = AudioConfig.from_env()
     model_size = os.getenv("STT_MODEL") or "tiny"
 
     # Validate model - includes new distil models as additional options
@@ -286,16 +408,26 @@ def main():
         return
 
     try:
-        audio_data = record_audio(max_seconds=max_seconds, silence_threshold=silence_threshold)
+        samples = record_audio(config, warmup_callback=lambda: warm_up(model_size))
 
-        if len(audio_data) < 1000:
+        if len(samples) < 500:
             result = {
                 "success": False,
                 "error": "no_speech",
                 "message": "No speech detected."
             }
         else:
-            result = transcribe_local(audio_data, language, model_size)
+            result = None
+            transcribe_args = (samples, language, model_size, config.client_vad, config.silence_threshold)
+
+            # Prefer the resident server, which keeps the model loaded
+            if USE_SERVER:
+                result = transcribe_via_server(*transcribe_args)
+                if result is None and start_server():
+                    result = transcribe_via_server(*transcribe_args)
+
+            if result is None:
+                result = transcribe_local(*transcribe_args)
 
     except RuntimeError as e:
         result = {
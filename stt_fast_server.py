@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Resident faster-whisper model server for stt_fast_local.py
+
+stt_fast_local.py runs once per utterance, so loading the Whisper model
+used to be part of every call (1-3 seconds for tiny/base). This server
+keeps the CTranslate2 models loaded and transcribes audio sent over a
+UNIX socket. stt_fast_local.py starts it automatically on first use and
+falls back to in-process transcription if it is not reachable.
+
+Protocol (one request per connection, client shuts down writing after
+sending):
+  Request:  {"pcm_b64": "<base64 16 kHz mono int16 PCM>", "language": "de",
+             "model": "tiny", "client_vad": "webrtc", "silence_threshold": 2.0}
+  Response: the same JSON result stt_fast_local.py prints
+
+Usage:
+  python3 stt_fast_server.py
+
+Environment Variables:
+  STT_MODEL - Model to preload at startup, default: "tiny"
+  STT_SOCKET - Socket path, default: $XDG_RUNTIME_DIR/stt.sock
+  STT_SERVER_IDLE_SECONDS - Exit after this many seconds without requests,
+                            default: 900
+"""
+
+import base64
+import json
+import os
+import signal
+import socketserver
+import sys
+
+import numpy as np
+
+from stt_fast_local import SOCKET_PATH, server_running, transcribe_local, warm_model
+
+
+class TranscriptionHandler(socketserver.StreamRequestHandler):
+    """Handle a single transcription request."""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.read())
+            samples = np.frombuffer(base64.b64decode(request["pcm_b64"]), dtype=np.int16)
+            result = transcribe_local(
+                samples,
+                request.get("language"),
+                request.get("model") or "tiny",
+                request.get("client_vad") or "rms",
+                float(request.get("silence_threshold") or 2.0)
+            )
+
+        except Exception as e:
+            result = {
+                "success": False,
+                "error": "error",
+                "message": f"Invalid server request: {str(e)}"
+            }
+
+        self.wfile.write(json.dumps(result).encode())
+
+
+class TranscriptionServer(socketserver.UnixStreamServer):
+    """UNIX socket server that stops after an idle timeout."""
+
+    idle = False
+
+    def handle_timeout(self):
+        self.idle = True
+
+
+def main():
+    """Main entry point."""
+
+    if server_running():
+        print(f"Server already running on {SOCKET_PATH}", file=sys.stderr)
+        return
+
+    # Remove a stale socket left behind by a crashed server
+    try:
+        os.unlink(SOCKET_PATH)
+    except FileNotFoundError:
+        pass
+
+    idle_seconds = float(os.getenv("STT_SERVER_IDLE_SECONDS") or "900")
+
+    # Bind before loading the model so clients can connect right away;
+    # their requests queue up until the model is ready
+    old_umask = os.umask(0o077)
+    try:
+        server = TranscriptionServer(SOCKET_PATH, TranscriptionHandler)
+    finally:
+        os.umask(old_umask)
+
+    server.timeout = idle_seconds
+
+    # Exit through the finally below on SIGTERM, so the socket is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    try:
+        try:
+            warm_model(os.getenv("STT_MODEL") or "tiny")
+        except Exception as e:
+            print(f"Failed to preload model: {e}", file=sys.stderr)
+
+        while not server.idle:
+            server.handle_request()
+
+    finally:
+        server.server_close()
+        try:
+            os.unlink(SOCKET_PATH)
+        except FileNotFoundError:
+            pass
+
+
+if __name__ == "__main__":
+    main()
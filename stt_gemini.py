@@ -1,13 +1,15 @@
 #!/usr/bin/env python3
 """
-Speech-to-Text using Gemini CLI
+Speech-to-Text using the Gemini API
 
 Uses Gemini's multimodal capabilities to transcribe audio.
-Leverages existing Gemini CLI OAuth authentication.
+The recording is sent inline with the request via the google-genai SDK.
 
 Requirements:
-- gemini CLI installed and authenticated
-- pip install pyaudio
+- pip install google-genai sounddevice numpy
+- GEMINI_API_KEY (or GOOGLE_API_KEY) environment variable set
+- Optional: pip install webrtcvad (more reliable end-of-speech detection)
+- Optional: pip install scipy (resampling for devices without 16 kHz input)
 
 Usage:
   python3 stt_gemini.py
@@ -16,213 +18,102 @@ Environment Variables:
   STT_LANGUAGE - Language hint (e.g., "de", "en"), default: auto-detect
   STT_MAX_SECONDS - Maximum recording time in seconds, default: 60
   STT_SILENCE_THRESHOLD - Silence duration to stop recording, default: 2.0
+  STT_CHUNK_MS - Audio buffer size in milliseconds (at least 10), default: 20
+  STT_CLIENT_VAD - End-of-speech detection while recording: "webrtc" or "rms",
+                   default: "webrtc" if webrtcvad is installed
+  STT_GEMINI_MODEL - Gemini model, default: "gemini-2.5-flash"
+  GEMINI_API_KEY - Your Gemini API key
 """
 
-import base64
-import io
 import json
 import os
-import subprocess
-import sys
-import tempfile
+import threading
 import time
-import wave
-from pathlib import Path
 
-# Audio recording parameters
-CHUNK = 1024
-FORMAT_PYAUDIO = None  # Set after import
-CHANNELS = 1
-RATE = 16000
+from stt_common import AudioConfig, check_audio_deps, encode_wav, record_audio
+
+GEMINI_MODEL = os.getenv("STT_GEMINI_MODEL") or "gemini-2.5-flash"
 
 
 def check_dependencies():
     """Check if required packages are installed."""
-    missing = []
+    missing = check_audio_deps()
 
     try:
-        import pyaudio
-        global FORMAT_PYAUDIO
-        FORMAT_PYAUDIO = pyaudio.paInt16
+        from google import genai
     except ImportError:
-        missing.append("pyaudio")
-
-    # Check gemini CLI
-    try:
-        result = subprocess.run(
-            ["gemini", "--version"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if result.returncode != 0:
-            missing.append("gemini-cli (not working)")
-    except FileNotFoundError:
-        missing.append("gemini-cli (not installed)")
-    except Exception:
-        missing.append("gemini-cli (error)")
+        missing.append("google-genai")
 
     if missing:
         return {
             "success": False,
             "error": "missing_dependencies",
-            "message": f"Missing: {', '.join(missing)}",
+            "message": f"Missing packages: {', '.join(missing)}. Install with: pip install {' '.join(missing)}",
             "retryable": False
         }
 
     return None
 
 
-def record_audio(max_seconds: float = 60.0, silence_threshold: float = 2.0) -> bytes:
-    """Record audio from microphone until silence is detected."""
-    import pyaudio
-    import struct
-    import math
-
-    p = pyaudio.PyAudio()
-
-    # Find the default input device
-    try:
-        default_device = p.get_default_input_device_info()
-        device_index = default_device['index']
-    except IOError:
-        device_index = None
-        for i in range(p.get_device_count()):
-            dev = p.get_device_info_by_index(i)
-            if dev['maxInputChannels'] > 0:
-                device_index = i
-                break
-
-        if device_index is None:
-            p.terminate()
-            raise RuntimeError("No audio input device found")
-
-    stream = p.open(
-        format=FORMAT_PYAUDIO,
-        channels=CHANNELS,
-        rate=RATE,
-        input=True,
-        input_device_index=device_index,
-        frames_per_buffer=CHUNK
-    )
-
-    frames = []
-    start_time = time.time()
-    last_sound_time = time.time()
-    has_speech = False
-    SILENCE_RMS_THRESHOLD = 500
-
-    print("Recording... (speak now)", file=sys.stderr)
-
-    try:
-        while True:
-            elapsed = time.time() - start_time
-            if elapsed > max_seconds:
-                break
-
-            data = stream.read(CHUNK, exception_on_overflow=False)
-            frames.append(data)
+# Client shared by the warmup thread and the transcription request
+_client = None
+_client_lock = threading.Lock()
 
-            shorts = struct.unpack(f'{CHUNK}h', data)
-            rms = math.sqrt(sum(s ** 2 for s in shorts) / CHUNK)
 
-            if rms > SILENCE_RMS_THRESHOLD:
-                has_speech = True
-                last_sound_time = time.time()
+def get_client():
+    """Get or create the cached Gemini client."""
+    global _client
+    from google import genai
+    from google.genai import types
 
-            if has_speech and (time.time() - last_sound_time) > silence_threshold:
-                break
+    with _client_lock:
+        if _client is None:
+            _client = genai.Client(http_options=types.HttpOptions(timeout=60000))
 
-    finally:
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
+        return _client
 
-    print("Recording finished.", file=sys.stderr)
 
-    # Convert to WAV
-    wav_buffer = io.BytesIO()
-    with wave.open(wav_buffer, 'wb') as wf:
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(2)
-        wf.setframerate(RATE)
-        wf.writeframes(b''.join(frames))
+def warm_up():
+    """Open the HTTPS connection to the API while the user is still speaking."""
+    if not (os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")):
+        return
 
-    return wav_buffer.getvalue()
+    try:
+        get_client().models.get(model=GEMINI_MODEL)
+    except Exception:
+        pass  # Errors surface again during transcription
 
 
 def transcribe_with_gemini(audio_data: bytes, language: str = None) -> dict:
-    """Use Gemini CLI to transcribe audio."""
+    """Send audio to the Gemini API for transcription."""
+    from google.genai import errors, types
 
-    # Save audio to temp file
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-        tmp.write(audio_data)
-        tmp_path = tmp.name
+    if not (os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")):
+        return {
+            "success": False,
+            "error": "auth",
+            "message": "GEMINI_API_KEY environment variable not set. Set it with: export GEMINI_API_KEY='your-key'",
+            "retryable": False
+        }
 
-    try:
-        # Build prompt for Gemini
-        lang_hint = f" in {language}" if language else ""
-        prompt = f"""Transcribe the following audio file{lang_hint}.
+    lang_hint = f" in {language}" if language else ""
+    prompt = f"""Transcribe the spoken words in this audio recording{lang_hint}.
 Return ONLY the transcribed text, nothing else.
 No explanations, no formatting, just the spoken words.
-If there is no speech or it's unclear, respond with: [NO_SPEECH]
-
-Audio file: {tmp_path}"""
+If there is no speech or it's unclear, respond with exactly: [NO_SPEECH]"""
 
-        # Note: Gemini CLI may need the file path passed differently
-        # For now, we'll use base64 encoding in the prompt
-        with open(tmp_path, "rb") as f:
-            audio_b64 = base64.b64encode(f.read()).decode()
-
-        # Alternative prompt with base64
-        prompt = f"""I have an audio recording that I need transcribed{lang_hint}.
-The audio is base64 encoded WAV format.
-
-Please transcribe the spoken words. Return ONLY the transcript text.
-If there is no clear speech, respond with exactly: [NO_SPEECH]
-
-Base64 audio (WAV, 16kHz, mono):
-{audio_b64[:100]}...
+    try:
+        client = get_client()
 
-[Note: This is a speech-to-text request. Please transcribe what you hear in the audio.]"""
+        # A recording of up to a few minutes fits well within the inline
+        # request limit, which saves the separate Files API upload
+        audio_part = types.Part.from_bytes(data=audio_data, mime_type="audio/wav")
 
         start = time.time()
-
-        # Call Gemini CLI
-        result = subprocess.run(
-            ["gemini", "-m", "gemini-2.5-pro", prompt],
-            capture_output=True,
-            text=True,
-            timeout=60
-        )
-
+        response = client.models.generate_content(model=GEMINI_MODEL, contents=[audio_part, prompt])
         elapsed = time.time() - start
 
-        if result.returncode != 0:
-            stderr = result.stderr.strip()
-            if "auth" in stderr.lower() or "login" in stderr.lower():
-                return {
-                    "success": False,
-                    "error": "auth",
-                    "message": "Gemini CLI not authenticated. Run: gemini auth login",
-                    "retryable": False
-                }
-            elif "rate" in stderr.lower() or "limit" in stderr.lower():
-                return {
-                    "success": False,
-                    "error": "limit",
-                    "message": "Gemini rate limit reached.",
-                    "retryable": False
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": "cli_error",
-                    "message": f"Gemini CLI error: {stderr}",
-                    "retryable": False
-                }
-
-        transcript = result.stdout.strip()
+        transcript = (response.text or "").strip()
 
         # Check for no speech marker
         if transcript == "[NO_SPEECH]" or not transcript:
@@ -239,11 +130,34 @@ Base64 audio (WAV, 16kHz, mono):
             "provider": "gemini"
         }
 
-    except subprocess.TimeoutExpired:
+    except errors.ClientError as e:
+        if e.code in (401, 403):
+            return {
+                "success": False,
+                "error": "auth",
+                "message": "Gemini API authentication failed. Check your GEMINI_API_KEY.",
+                "retryable": False
+            }
+        elif e.code == 429:
+            return {
+                "success": False,
+                "error": "limit",
+                "message": "Gemini rate limit reached.",
+                "retryable": False
+            }
+        else:
+            return {
+                "success": False,
+                "error": "api_error",
+                "message": f"Gemini API error: {str(e)}",
+                "retryable": False
+            }
+
+    except errors.APIError as e:
         return {
             "success": False,
-            "error": "timeout",
-            "message": "Gemini request timed out.",
+            "error": "api_error",
+            "message": f"Gemini API error: {str(e)}",
             "retryable": False
         }
 
@@ -255,12 +169,6 @@ Base64 audio (WAV, 16kHz, mono):
             "retryable": False
         }
 
-    finally:
-        try:
-            Path(tmp_path).unlink()
-        except:
-            pass
-
 
 def main():
     """Main entry point."""
@@ -271,20 +179,19 @@ def main():
         return
 
     language = os.getenv("STT_LANGUAGE") or None
-    max_seconds = float(os.getenv("STT_MAX_SECONDS") or "60")
-    silence_threshold = float(os.getenv("STT_SILENCE_THRESHOLD") or "2.0")
+    config = AudioConfig.from_env()
 
     try:
-        audio_data = record_audio(max_seconds=max_seconds, silence_threshold=silence_threshold)
+        samples = record_audio(config, warmup_callback=warm_up)
 
-        if len(audio_data) < 1000:
+        if len(samples) < 500:
             result = {
                 "success": False,
                 "error": "no_speech",
                 "message": "No speech detected."
             }
         else:
-            result = transcribe_with_gemini(audio_data, language)
+            result = transcribe_with_gemini(encode_wav(samples), language)
 
     except RuntimeError as e:
         result = {
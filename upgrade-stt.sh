@@ -75,7 +75,7 @@ echo "  /stt-once {\"language\": \"de\"}        # German language"
 echo ""
 echo "Requirements for Cloud Mode:"
 echo "  1. OPENAI_API_KEY environment variable set"
-echo "  2. pip install openai pyaudio"
+echo "  2. pip install openai sounddevice numpy"
 echo ""
 echo "Backup Location: $BACKUP_DIR"
 echo ""